@@ -2,9 +2,25 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.subplots import make_subplots
+from collections import OrderedDict
 from datetime import datetime
+import os
 import numpy as np
 
+from convert import SOURCE, TARGET, convert
+
+# Optional accelerators; the pandas/NumPy paths are used when they are missing
+try:
+    import numexpr as ne
+except ImportError:
+    ne = None
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
 # Page configuration with better theme and favicon
 st.set_page_config(
     page_title='Dashboard ESG - Análise Avançada',
@@ -26,30 +42,325 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
-# Cache data with improved error handling
-@st.cache_data(ttl=3600)
+# Shared read-only base frame: cache_resource hands every session the same
+# object, so callers must copy before mutating it. Errors propagate so that a
+# failed load is not cached
+@st.cache_resource(ttl=3600)
 def load_data():
-    try:
-        df = pd.read_excel('dataset_esg_sem_2015.xlsx')
-        # Data cleaning and preprocessing
-        df['Ano'] = df['Ano'].astype(int)
-        df['Receita'] = pd.to_numeric(df['Receita'], errors='coerce')
-        df['MargemLucro'] = pd.to_numeric(df['MargemLucro'], errors='coerce')
-        df['Emissao_Carbono'] = pd.to_numeric(df['Emissao_Carbono'], errors='coerce')
-        return df.dropna(subset=['ESG_Geral', 'Receita'])
-    except Exception as e:
-        st.error(f"Erro ao carregar dados: {str(e)}")
-        return pd.DataFrame()
-
-df = load_data()
+    # Generated from the spreadsheet on first run, and again whenever the
+    # spreadsheet or the conversion (schema) is newer than the Parquet file
+    inputs = [SOURCE, convert.__code__.co_filename]
+    if not os.path.exists(TARGET) or max(map(os.path.getmtime, inputs)) > os.path.getmtime(TARGET):
+        convert()
+    # Cleaned, typed and sorted by Ano in convert.py, so no coercion is needed here
+    df = pd.read_parquet(TARGET, engine='pyarrow')
+    if not df['Ano'].is_monotonic_increasing:
+        df = df.sort_values('Ano', kind='stable', ignore_index=True)
+    return df
+
+# Filtered view keyed on the filter state, so repeated states skip the scan
+@st.cache_data(ttl=600, max_entries=32)
+def apply_filters(year_range, regions, revenue_range, margin_range):
+    df = load_data()
+    year_min, year_max = year_range
+    revenue_min, revenue_max = revenue_range
+    margin_min, margin_max = margin_range
+    # Rows are sorted by Ano, so the year range is a contiguous slice found by
+    # binary search and the remaining predicates only scan that slice
+    years = df['Ano'].to_numpy()
+    start = np.searchsorted(years, year_min, side='left')
+    stop = np.searchsorted(years, year_max, side='right')
+    df = df.iloc[start:stop]
+    # Range clauses fused into one expression, evaluated by numexpr when installed;
+    # isin stays outside since numexpr can't evaluate it
+    in_range = df.eval(
+        'Receita >= @revenue_min and Receita <= @revenue_max and '
+        'MargemLucro >= @margin_min and MargemLucro <= @margin_max'
+    )
+    # Region membership as a lookup over the categories gathered through the codes
+    region_codes = df['Regiao'].cat.codes.to_numpy()
+    allowed = df['Regiao'].cat.categories.isin(regions)
+    in_region = allowed[region_codes] & (region_codes >= 0)
+    df_filtered = df.loc[in_range & in_region].copy()
+
+    # Add calculated metrics on the raw arrays, skipping pandas alignment
+    em = df_filtered['Emissao_Carbono'].to_numpy()
+    rec = df_filtered['Receita'].to_numpy()
+    if ne is not None:
+        df_filtered['Emissao_por_Receita'] = ne.evaluate('em / rec', local_dict={'em': em, 'rec': rec})
+    else:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            df_filtered['Emissao_por_Receita'] = np.divide(em, rec)
+    return df_filtered
+
+ESG_COMPONENTS = ['ESG_Ambiental', 'ESG_Social', 'ESG_Governanca']
+
+if njit is not None:
+    # Per-region sums/non-NaN counts of every component in one pass over the rows.
+    # A plain njit loop rather than guvectorize: the region count k is not a
+    # dimension of any input, which gufunc layouts cannot express
+    @njit(cache=True)
+    def region_sums_kernel(codes, values, n_regions):
+        n, m = values.shape
+        sums = np.zeros((n_regions, m))
+        counts = np.zeros((n_regions, m))
+        rows = np.zeros(n_regions, dtype=np.int64)
+        for i in range(n):
+            c = codes[i]
+            if c < 0:
+                continue
+            rows[c] += 1
+            for j in range(m):
+                v = values[i, j]
+                if not np.isnan(v):
+                    sums[c, j] += v
+                    counts[c, j] += 1
+        return sums, counts, rows
+
+# Per-region ESG component means in one pass, keyed on the filter state
+@st.cache_data(ttl=600, max_entries=32)
+def region_esg_means(year_range, regions, revenue_range, margin_range):
+    df_filtered = apply_filters(year_range, regions, revenue_range, margin_range)
+    if njit is None:
+        return df_filtered.groupby('Regiao', observed=True)[ESG_COMPONENTS].mean()
+
+    categories = df_filtered['Regiao'].cat.categories
+    sums, counts, rows = region_sums_kernel(
+        df_filtered['Regiao'].cat.codes.to_numpy(),
+        df_filtered[ESG_COMPONENTS].to_numpy(),
+        len(categories)
+    )
+    observed = rows > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = sums[observed] / counts[observed]
+    return pd.DataFrame(
+        means,
+        index=pd.Index(categories[observed], name='Regiao'),
+        columns=ESG_COMPONENTS
+    )
+
+KPI_COLUMNS = ['ESG_Geral', 'Receita', 'Emissao_Carbono']
+
+if njit is not None:
+    # The three KPI sums in one pass over the float32 columns, with float64
+    # accumulators; emissions may hold NaNs, which are skipped
+    @njit(cache=True)
+    def kpi_kernel(esg, rec, em):
+        esg_sum = 0.0
+        rec_sum = 0.0
+        em_sum = 0.0
+        for i in range(esg.shape[0]):
+            esg_sum += esg[i]
+            rec_sum += rec[i]
+            if not np.isnan(em[i]):
+                em_sum += em[i]
+        return esg_sum, rec_sum, em_sum
+
+# KPI scalars. ESG_Geral and Receita never hold NaNs (dropped at conversion),
+# so sum / count equals the mean
+def summarize(frame):
+    n = len(frame)
+    if njit is not None:
+        esg_sum, rec_sum, em_sum = kpi_kernel(*(frame[c].to_numpy() for c in KPI_COLUMNS))
+    else:
+        # Copies the columns into one 2D array, then reduces it with float64
+        # accumulators so the float32 totals stay exact for display
+        esg_sum, rec_sum, em_sum = np.nansum(
+            frame[KPI_COLUMNS].to_numpy(), axis=0, dtype=np.float64
+        )
+    return {
+        'count': n,
+        'esg_mean': esg_sum / n if n else np.nan,
+        'revenue_mean': rec_sum / n if n else np.nan,
+        'emissions_sum': em_sum
+    }
+
+# Baseline aggregates used by the KPI deltas
+@st.cache_data(ttl=3600)
+def compute_baseline():
+    return summarize(load_data())
+
+@st.cache_data(ttl=600, max_entries=32)
+def filtered_kpis(year_range, regions, revenue_range, margin_range):
+    return summarize(apply_filters(year_range, regions, revenue_range, margin_range))
+
+# Buckets per axis for the trend cube
+TREND_BINS = 20
+TREND_STATS = ['cnt', 'rec_sum', 'esg_sum', 'em_sum']
+TREND_METRICS = ['ESG_Geral', 'Receita', 'Emissao_Carbono']
+# Points per region above which trend traces are LTTB-downsampled
+TREND_MAX_POINTS = 2000
+
+# Trend aggregates per (revenue bucket, margin bucket, Ano, Regiao), built once
+# with dense bincount arrays so each rerun only rolls up the buckets selected by
+# the sliders. The base rows are also kept ordered by bucket, so the rows of any
+# bucket are one contiguous slice and partly selected buckets can be
+# aggregated exactly without touching the rest of the data
+@st.cache_resource(ttl=3600)
+def build_trend_cube():
+    df = load_data()
+    rev_bin, rev_edges = pd.cut(df['Receita'], bins=TREND_BINS, labels=False, retbins=True)
+    margin_bin, margin_edges = pd.cut(df['MargemLucro'], bins=TREND_BINS, labels=False, retbins=True)
+
+    # (Ano, Regiao) pairs as one integer group id
+    year0 = int(df['Ano'].min())
+    n_years = int(df['Ano'].max()) - year0 + 1
+    categories = df['Regiao'].cat.categories
+    region_codes = df['Regiao'].cat.codes.to_numpy()
+    n_groups = n_years * len(categories)
+
+    # Rows without a region or margin bucket (NaNs) never pass the filters
+    valid = margin_bin.notna().to_numpy() & (region_codes >= 0)
+    group = ((df['Ano'].to_numpy()[valid] - year0) * len(categories) + region_codes[valid]).astype(np.intp)
+    bucket = (rev_bin.to_numpy()[valid] * TREND_BINS + margin_bin.to_numpy()[valid]).astype(np.intp)
+    order = np.argsort(bucket, kind='stable')
+    rows = {
+        'group': group[order],
+        'Receita': df['Receita'].to_numpy()[valid][order],
+        'MargemLucro': df['MargemLucro'].to_numpy()[valid][order],
+        'ESG_Geral': df['ESG_Geral'].to_numpy()[valid][order],
+        'Emissao_Carbono': df['Emissao_Carbono'].to_numpy()[valid][order]
+    }
+    bucket_starts = np.searchsorted(bucket[order], np.arange(TREND_BINS * TREND_BINS + 1))
+
+    cells = bucket[order] * n_groups + rows['group']
+    stats = trend_stats(rows, cells, TREND_BINS * TREND_BINS * n_groups)
+
+    # pd.cut widens the first edge below the minimum; the bucket's rows start at
+    # the minimum itself, which lets a full-range slider cover it entirely
+    rev_edges[0] = df['Receita'].min()
+    margin_edges[0] = df['MargemLucro'].min()
+    return {
+        'stats': stats.reshape(TREND_BINS, TREND_BINS, n_groups, len(TREND_STATS)),
+        'rows': rows,
+        'bucket_starts': bucket_starts,
+        'rev_edges': rev_edges,
+        'margin_edges': margin_edges,
+        'year0': year0,
+        'categories': categories
+    }
+
+def trend_stats(rows, ids, size):
+    # Row counts and float64 sums of the trend metrics per id, in TREND_STATS order
+    return np.stack([
+        np.bincount(ids, minlength=size),
+        np.bincount(ids, weights=rows['Receita'], minlength=size),
+        np.bincount(ids, weights=rows['ESG_Geral'], minlength=size),
+        np.bincount(ids, weights=np.nan_to_num(rows['Emissao_Carbono']), minlength=size)
+    ], axis=-1)
+
+def interior_bins(edges, low, high):
+    # Buckets whose values all lie inside [low, high]
+    return (edges[:-1] >= low) & (edges[1:] <= high)
+
+def overlapping_bins(edges, low, high):
+    # Buckets that may hold values inside [low, high]
+    return (edges[:-1] <= high) & (edges[1:] >= low)
+
+@st.cache_data(ttl=600, max_entries=32)
+def trend_frame(year_range, regions, revenue_range, margin_range):
+    trend_cube = build_trend_cube()
+    stats = trend_cube['stats']
+    rev_edges = trend_cube['rev_edges']
+    margin_edges = trend_cube['margin_edges']
+    n_groups = stats.shape[2]
+    categories = trend_cube['categories']
+
+    # Groups whose (Ano, Regiao) pass the year and region filters
+    years = trend_cube['year0'] + np.arange(n_groups) // len(categories)
+    group_regions = np.arange(n_groups) % len(categories)
+    selected = (
+        (years >= year_range[0]) & (years <= year_range[1]) &
+        categories.isin(regions)[group_regions]
+    )
+
+    # Buckets fully inside the revenue/margin ranges come straight from the cube
+    inner = np.outer(
+        interior_bins(rev_edges, *revenue_range),
+        interior_bins(margin_edges, *margin_range)
+    )
+    totals = stats[inner].sum(axis=0)
+
+    # Edge buckets are only partly selected: aggregate exactly the rows of those
+    # buckets alone, read as slices of the bucket-ordered rows
+    edge = np.outer(
+        overlapping_bins(rev_edges, *revenue_range),
+        overlapping_bins(margin_edges, *margin_range)
+    ) & ~inner
+    starts = trend_cube['bucket_starts']
+    positions = np.concatenate(
+        [np.arange(starts[b], starts[b + 1]) for b in np.flatnonzero(edge)]
+        or [np.empty(0, dtype=np.intp)]
+    )
+    rows = {name: values[positions] for name, values in trend_cube['rows'].items()}
+    keep = (
+        (rows['Receita'] >= revenue_range[0]) & (rows['Receita'] <= revenue_range[1]) &
+        (rows['MargemLucro'] >= margin_range[0]) & (rows['MargemLucro'] <= margin_range[1])
+    )
+    rows = {name: values[keep] for name, values in rows.items()}
+    totals += trend_stats(rows, rows['group'], n_groups)
+
+    groups = np.flatnonzero(selected & (totals[:, 0] > 0))
+    cnt, rec_sum, esg_sum, em_sum = totals[groups].T
+    df_trend = pd.DataFrame({
+        'Ano': years[groups],
+        'Regiao': pd.Categorical.from_codes(group_regions[groups], categories=categories),
+        'ESG_Geral': esg_sum / cnt,
+        'Receita': rec_sum / cnt,
+        'Emissao_Carbono': em_sum
+    })
+    return downsample_trend(df_trend)
+
+def downsample_trend(df_trend):
+    # Keep the union of the LTTB picks of every metric so regions share one frame;
+    # each metric gets an equal share of the budget so the union stays within it.
+    # Requires tsdownsample (pip install tsdownsample) in the app's environment once
+    # a region exceeds TREND_MAX_POINTS; with one point per year that never happens
+    # on the current dataset, hence the lazy import
+    sizes = df_trend.groupby('Regiao', observed=True).size()
+    if not (sizes > TREND_MAX_POINTS).any():
+        return df_trend
+
+    from tsdownsample import MinMaxLTTBDownsampler
+    downsampler = MinMaxLTTBDownsampler()
+    n_out = TREND_MAX_POINTS // len(TREND_METRICS)
+    keep = []
+    for _, group in df_trend.groupby('Regiao', observed=True):
+        if len(group) <= TREND_MAX_POINTS:
+            keep.append(group.index.to_numpy())
+            continue
+        x = group['Ano'].to_numpy()
+        for metric in TREND_METRICS:
+            idx = downsampler.downsample(x, group[metric].to_numpy(), n_out=n_out)
+            keep.append(group.index.to_numpy()[idx])
+    return df_trend.loc[np.unique(np.concatenate(keep))]
+
+# Sidebar widget bounds, keyed on the identity of the shared base frame
+@st.cache_data
+def column_bounds(df_id):
+    df = load_data()
+    return {
+        'Ano': (int(df['Ano'].min()), int(df['Ano'].max())),
+        'Regiao': sorted(df['Regiao'].unique()),
+        'Receita': (float(df['Receita'].min()), float(df['Receita'].max())),
+        'MargemLucro': (float(df['MargemLucro'].min()), float(df['MargemLucro'].max()))
+    }
+
+try:
+    df = load_data()
+except Exception as e:
+    st.error(f"Erro ao carregar dados: {str(e)}")
+    st.stop()
+baseline = compute_baseline()
+bounds = column_bounds(id(df))
 
 # Reset control with improved state management
 if 'reset' not in st.session_state:
     st.session_state.reset = {
-        'year_range': (df['Ano'].min(), df['Ano'].max()),
-        'regions': sorted(df['Regiao'].unique()),
-        'revenue_range': (float(df['Receita'].min()), float(df['Receita'].max())),
-        'margin_range': (float(df['MargemLucro'].min()), float(df['MargemLucro'].max()))
+        'year_range': bounds['Ano'],
+        'regions': bounds['Regiao'],
+        'revenue_range': bounds['Receita'],
+        'margin_range': bounds['MargemLucro']
     }
 
 
@@ -66,8 +377,8 @@ with st.sidebar:
     # Year range slider with marks
     year_range = st.slider(
         'Selecione o intervalo de anos:',
-        min_value=df['Ano'].min(),
-        max_value=df['Ano'].max(),
+        min_value=bounds['Ano'][0],
+        max_value=bounds['Ano'][1],
         value=st.session_state.get('year_range', st.session_state.reset['year_range']),
         step=1,
         key='year_range'
@@ -76,7 +387,7 @@ with st.sidebar:
     # Region selector with search
     regions = st.multiselect(
         'Selecione as regiões:',
-        options=sorted(df['Regiao'].unique()),
+        options=bounds['Regiao'],
         default=st.session_state.get('regions', st.session_state.reset['regions']),
         key='regions'
     )
@@ -84,8 +395,8 @@ with st.sidebar:
     # Revenue range with logarithmic option
     revenue_range = st.slider(
         'Faixa de Receita (em milhões):',
-        min_value=float(df['Receita'].min()),
-        max_value=float(df['Receita'].max()),
+        min_value=bounds['Receita'][0],
+        max_value=bounds['Receita'][1],
         value=st.session_state.get('revenue_range', st.session_state.reset['revenue_range']),
         key='revenue_range'
     )
@@ -93,30 +404,27 @@ with st.sidebar:
     # Margin range with better formatting
     margin_range = st.slider(
         'Faixa de Margem de Lucro (%):',
-        min_value=float(df['MargemLucro'].min()),
-        max_value=float(df['MargemLucro'].max()),
+        min_value=bounds['MargemLucro'][0],
+        max_value=bounds['MargemLucro'][1],
         value=st.session_state.get('margin_range', st.session_state.reset['margin_range']),
         format='%.1f%%',
         key='margin_range'
     )
 
 # Apply filters with error handling
+filters = (
+    tuple(year_range),
+    tuple(sorted(regions)),
+    tuple(revenue_range),
+    tuple(margin_range)
+)
 try:
-    df_filtered = df[
-        (df['Ano'] >= year_range[0]) & 
-        (df['Ano'] <= year_range[1]) &
-        (df['Regiao'].isin(regions)) &
-        (df['Receita'] >= revenue_range[0]) &
-        (df['Receita'] <= revenue_range[1]) &
-        (df['MargemLucro'] >= margin_range[0]) &
-        (df['MargemLucro'] <= margin_range[1])
-    ].copy()
-    
-    # Add calculated metrics
-    df_filtered['Emissao_por_Receita'] = df_filtered['Emissao_Carbono'] / df_filtered['Receita']
+    df_filtered = apply_filters(*filters)
+    kpis = filtered_kpis(*filters)
 except Exception as e:
     st.error(f"Erro ao filtrar dados: {str(e)}")
     df_filtered = pd.DataFrame()
+    kpis = {'count': 0, 'esg_mean': np.nan, 'revenue_mean': np.nan, 'emissions_sum': 0.0}
 
 # Main layout with improved structure
 st.title('📊 Dashboard ESG - Análise Avançada')
@@ -129,16 +437,16 @@ st.markdown("""
 # Enhanced KPIs with delta indicators
 col1, col2, col3, col4 = st.columns(4)
 with col1:
-    delta = len(df_filtered) - len(df) if len(df_filtered) != len(df) else None
+    delta = kpis['count'] - baseline['count'] if kpis['count'] != baseline['count'] else None
     st.metric(
         label="📈 Empresas Analisadas", 
-        value=f"{len(df_filtered):,}",
+        value=f"{kpis['count']:,}",
         delta=f"{delta:,}" if delta else None
     )
 
 with col2:
-    avg_esg = df_filtered['ESG_Geral'].mean()
-    delta_esg = avg_esg - df['ESG_Geral'].mean() if not df_filtered.empty else None
+    avg_esg = kpis['esg_mean']
+    delta_esg = avg_esg - baseline['esg_mean'] if not df_filtered.empty else None
     st.metric(
         label="🌱 Média ESG Geral", 
         value=f"{avg_esg:.1f}",
@@ -146,8 +454,8 @@ with col2:
     )
 
 with col3:
-    avg_revenue = df_filtered['Receita'].mean()
-    delta_revenue = avg_revenue - df['Receita'].mean() if not df_filtered.empty else None
+    avg_revenue = kpis['revenue_mean']
+    delta_revenue = avg_revenue - baseline['revenue_mean'] if not df_filtered.empty else None
     st.metric(
         label="💸 Receita Média", 
         value=f"${avg_revenue:,.2f}M",
@@ -155,14 +463,172 @@ with col3:
     )
 
 with col4:
-    total_emissions = df_filtered['Emissao_Carbono'].sum()
-    delta_emissions = total_emissions - df['Emissao_Carbono'].sum() if not df_filtered.empty else None
+    total_emissions = kpis['emissions_sum']
+    delta_emissions = total_emissions - baseline['emissions_sum'] if not df_filtered.empty else None
     st.metric(
         label="🏭 Emissões Totais", 
         value=f"{total_emissions:,.0f} tCO2",
         delta=f"{delta_emissions:,.0f} tCO2" if delta_emissions else None
     )
 
+# Top-k rows by column in O(N), matching nlargest(keep='first'): ties keep the
+# earlier row, and NaN rows only fill in when there are fewer than k numbers
+def top_k(frame, col, k=5):
+    values = frame[col].to_numpy(dtype=float)
+    is_nan = np.isnan(values)
+    valid = np.flatnonzero(~is_nan)
+    if len(valid) <= k:
+        order = np.lexsort((valid, -values[valid]))
+        return frame.iloc[np.concatenate([valid[order], np.flatnonzero(is_nan)])[:k]]
+    kth = np.partition(values[valid], -k)[-k]
+    candidates = valid[values[valid] >= kth]
+    order = np.lexsort((candidates, -values[candidates]))
+    return frame.iloc[candidates[order[:k]]]
+
+# Figures built for a filter state are kept per session and reused on reruns
+FIGURE_CACHE_SIZE = 8
+
+def cached_figure(name, build):
+    if 'figure_cache' not in st.session_state:
+        st.session_state.figure_cache = OrderedDict()
+    cache = st.session_state.figure_cache
+
+    if filters in cache:
+        cache.move_to_end(filters)
+    else:
+        cache[filters] = {}
+        while len(cache) > FIGURE_CACHE_SIZE:
+            cache.popitem(last=False)
+
+    figures = cache[filters]
+    if name not in figures:
+        figures[name] = build()
+    return figures[name]
+
+# Figure builders
+def build_top_esg_figure():
+    top_esg = top_k(df_filtered, 'ESG_Geral')
+    fig = px.bar(
+        top_esg[['Nome_Compania', 'ESG_Geral', 'Regiao']],
+        x='Nome_Compania',
+        y='ESG_Geral',
+        color='Regiao',
+        title='Empresas com Melhor ESG',
+        labels={'ESG_Geral': 'Score ESG', 'Nome_Compania': 'Empresa'},
+        text='ESG_Geral'
+    )
+    fig.update_traces(texttemplate='%{text:.1f}', textposition='outside')
+    return fig
+
+def build_top_emitters_figure():
+    top_emitters = top_k(df_filtered, 'Emissao_Carbono')
+    fig = px.bar(
+        top_emitters[['Nome_Compania', 'Emissao_Carbono', 'Regiao']],
+        x='Nome_Compania',
+        y='Emissao_Carbono',
+        color='Regiao',
+        title='Empresas com Maiores Emissões',
+        labels={'Emissao_Carbono': 'Emissões (tCO2)', 'Nome_Compania': 'Empresa'},
+        text='Emissao_Carbono'
+    )
+    fig.update_traces(texttemplate='%{text:,.0f}', textposition='outside')
+    return fig
+
+def build_top_revenue_figure():
+    top_revenue = top_k(df_filtered, 'Receita')
+    fig = px.bar(
+        top_revenue[['Nome_Compania', 'Receita', 'Regiao']],
+        x='Nome_Compania',
+        y='Receita',
+        color='Regiao',
+        title='Empresas com Maiores Receitas',
+        labels={'Receita': 'Receita (US$ milhões)', 'Nome_Compania': 'Empresa'},
+        text='Receita'
+    )
+    fig.update_traces(texttemplate='US$ %{text:,.0f}M', textposition='outside')
+    return fig
+
+# Fixed shape of the ESG/revenue trend chart: one column per metric
+TREND_LINE_METRICS = ['ESG_Geral', 'Receita']
+# Same facet titles px.line produced with labels={'variable': 'Métrica'}
+TREND_LINE_TITLES = [f'Métrica={metric}' for metric in TREND_LINE_METRICS]
+TREND_LINE_LAYOUT = dict(
+    title=dict(text='Evolução do ESG e Receita por Região'),
+    legend=dict(title=dict(text='Regiao')),
+    xaxis=dict(title=dict(text='Ano')),
+    # Years zoom and pan together in both facets, as in the px.line facets
+    xaxis2=dict(title=dict(text='Ano'), matches='x'),
+    yaxis=dict(title=dict(text='Valor'))
+)
+
+def build_trend_line_figure():
+    # Aggregate data by year and region
+    df_trend = trend_frame(*filters)
+    df_trend_esg_rec = df_trend[['Ano', 'Regiao', 'ESG_Geral', 'Receita']]
+    fig = make_subplots(
+        rows=1,
+        cols=len(TREND_LINE_METRICS),
+        subplot_titles=TREND_LINE_TITLES,
+        horizontal_spacing=0.1
+    )
+    # Colorway of the active template (Streamlit's theme placeholders when
+    # themed), so regions keep the colours the other charts give them
+    palette = pio.templates[pio.templates.default].layout.colorway or px.colors.qualitative.Plotly
+    for i, (region, group) in enumerate(df_trend_esg_rec.groupby('Regiao', observed=True)):
+        # Same colour in both columns; the legend entry comes from the first only
+        color = palette[i % len(palette)]
+        x = group['Ano'].tolist()
+        for col, metric in enumerate(TREND_LINE_METRICS, start=1):
+            fig.add_trace(go.Scattergl(
+                x=x,
+                y=group[metric].tolist(),
+                mode='lines',
+                name=region,
+                legendgroup=region,
+                showlegend=(col == 1),
+                line=dict(color=color)
+            ), row=1, col=col)
+    fig.update_layout(TREND_LINE_LAYOUT)
+    return fig
+
+def build_trend_area_figure():
+    df_trend_em = trend_frame(*filters)[['Ano', 'Regiao', 'Emissao_Carbono']]
+    # Stacked area stays SVG: Scattergl has no stackgroup support.
+    # Plain lists skip Plotly's typed-array encoding of the trace data
+    fig = go.Figure()
+    for region, group in df_trend_em.groupby('Regiao', observed=True):
+        fig.add_trace(go.Scatter(
+            x=group['Ano'].tolist(),
+            y=group['Emissao_Carbono'].tolist(),
+            mode='lines',
+            stackgroup='one',
+            name=region
+        ))
+    fig.update_layout(
+        title='Emissões de Carbono ao Longo do Tempo',
+        xaxis_title='Ano',
+        yaxis_title='Emissões (tCO2)',
+        legend_title_text='Regiao'
+    )
+    return fig
+
+def build_radar_figure():
+    # One figure with a trace per region
+    region_means = region_esg_means(*filters)
+    fig = go.Figure()
+    for region, region_data in region_means.iterrows():
+        fig.add_trace(go.Scatterpolar(
+            r=region_data.tolist() + [region_data.iloc[0]],
+            theta=ESG_COMPONENTS + [ESG_COMPONENTS[0]],
+            fill='toself',
+            name=region
+        ))
+    fig.update_layout(
+        polar=dict(radialaxis=dict(visible=True)),
+        title='Desempenho ESG por Região'
+    )
+    return fig
+
 # Improved visualization functions
 def plot_top_companies():
     st.subheader('🔝 Empresas com Melhor e Pior Desempenho')
@@ -170,84 +636,24 @@ def plot_top_companies():
     tab1, tab2, tab3 = st.tabs(["🏆 Melhores em ESG", "⚠️ Maiores Emissoras", "💰 Maiores Receitas"])
     
     with tab1:
-        top_esg = df_filtered.nlargest(5, 'ESG_Geral')
-        fig = px.bar(
-            top_esg,
-            x='Nome_Compania',
-            y='ESG_Geral',
-            color='Regiao',
-            title='Empresas com Melhor ESG',
-            labels={'ESG_Geral': 'Score ESG', 'Nome_Compania': 'Empresa'},
-            text='ESG_Geral'
-        )
-        fig.update_traces(texttemplate='%{text:.1f}', textposition='outside')
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(cached_figure('top_esg', build_top_esg_figure), use_container_width=True)
     
     with tab2:
-        top_emitters = df_filtered.nlargest(5, 'Emissao_Carbono')
-        fig = px.bar(
-            top_emitters,
-            x='Nome_Compania',
-            y='Emissao_Carbono',
-            color='Regiao',
-            title='Empresas com Maiores Emissões',
-            labels={'Emissao_Carbono': 'Emissões (tCO2)', 'Nome_Compania': 'Empresa'},
-            text='Emissao_Carbono'
-        )
-        fig.update_traces(texttemplate='%{text:,.0f}', textposition='outside')
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(cached_figure('top_emitters', build_top_emitters_figure), use_container_width=True)
     
     with tab3:
-        top_revenue = df_filtered.nlargest(5, 'Receita')
-        fig = px.bar(
-            top_revenue,
-            x='Nome_Compania',
-            y='Receita',
-            color='Regiao',
-            title='Empresas com Maiores Receitas',
-            labels={'Receita': 'Receita (US$ milhões)', 'Nome_Compania': 'Empresa'},
-            text='Receita'
-        )
-        fig.update_traces(texttemplate='US$ %{text:,.0f}M', textposition='outside')
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(cached_figure('top_revenue', build_top_revenue_figure), use_container_width=True)
 
 def plot_trend_analysis():
     st.subheader('📈 Análise Temporal de Indicadores')
     
-    # Aggregate data by year and region
-    df_trend = df_filtered.groupby(['Ano', 'Regiao']).agg({
-        'ESG_Geral': 'mean',
-        'Receita': 'mean',
-        'Emissao_Carbono': 'sum',
-        'Emissao_por_Receita': 'mean'
-    }).reset_index()
-    
     tab1, tab2 = st.tabs(["📊 ESG e Receita", "🌍 Emissões"])
     
     with tab1:
-        fig = px.line(
-            df_trend,
-            x='Ano',
-            y=['ESG_Geral', 'Receita'],
-            color='Regiao',
-            facet_col='variable',
-            facet_col_spacing=0.1,
-            labels={'value': 'Valor', 'variable': 'Métrica'},
-            title='Evolução do ESG e Receita por Região'
-        )
-        fig.update_yaxes(matches=None)
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(cached_figure('trend_line', build_trend_line_figure), use_container_width=True)
     
     with tab2:
-        fig = px.area(
-            df_trend,
-            x='Ano',
-            y='Emissao_Carbono',
-            color='Regiao',
-            title='Emissões de Carbono ao Longo do Tempo',
-            labels={'Emissao_Carbono': 'Emissões (tCO2)'}
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(cached_figure('trend_area', build_trend_area_figure), use_container_width=True)
 
 def plot_correlation_analysis():
     st.subheader('🔗 Correlações entre Indicadores')
@@ -268,22 +674,6 @@ with tab2:
         
         # Radar chart for ESG components
         st.subheader('📡 Componentes do ESG por Região')
-        esg_components = ['ESG_Ambiental', 'ESG_Social', 'ESG_Governanca']
-        
-        for region in df_filtered['Regiao'].unique():
-            region_data = df_filtered[df_filtered['Regiao'] == region][esg_components].mean()
-            
-            fig = go.Figure()
-            fig.add_trace(go.Scatterpolar(
-                r=region_data.tolist() + [region_data.iloc[0]],
-                theta=esg_components + [esg_components[0]],
-                fill='toself',
-                name=region
-            ))
-            fig.update_layout(
-                polar=dict(radialaxis=dict(visible=True)),
-                title=f'Desempenho ESG - {region}'
-            )
-            st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(cached_figure('radar', build_radar_figure), use_container_width=True)
     else:
         st.warning("Nenhum dado encontrado com os filtros atuais.")
\ No newline at end of file
@@ -0,0 +1,32 @@
+import pandas as pd
+
+# One-off conversion of the Excel source to Parquet for the dashboard.
+# Cleaning happens here so the Parquet schema already carries the final dtypes.
+SOURCE = 'dataset_esg_sem_2015.xlsx'
+TARGET = 'dataset_esg.parquet'
+
+# Dashboard aggregates don't need double precision
+FLOAT_COLS = [
+    'Receita', 'MargemLucro', 'Emissao_Carbono',
+    'ESG_Geral', 'ESG_Ambiental', 'ESG_Social', 'ESG_Governanca'
+]
+CATEGORY_COLS = ['Regiao', 'Nome_Compania']
+
+def convert():
+    df = pd.read_excel(SOURCE)
+    # Data cleaning and preprocessing
+    df['Ano'] = df['Ano'].astype('int16')
+    # to_numeric(downcast='float') keeps float64 whenever float32 loses precision,
+    # so the cast is forced; sums are accumulated in float64 by the dashboard
+    df[FLOAT_COLS] = df[FLOAT_COLS].apply(pd.to_numeric, errors='coerce').astype('float32')
+    df[CATEGORY_COLS] = df[CATEGORY_COLS].astype('category')
+    df = df.dropna(subset=['ESG_Geral', 'Receita'])
+    # Sorted by year so row-group statistics on Ano are disjoint and the
+    # dashboard can slice the year range by binary search
+    df = df.sort_values('Ano', kind='stable', ignore_index=True)
+
+    df.to_parquet(TARGET, engine='pyarrow', compression='zstd', row_group_size=100000, index=False)
+    print(f"{len(df):,} linhas gravadas em {TARGET}")
+
+if __name__ == '__main__':
+    convert()